@@ -11,12 +11,13 @@ import os
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from scout.chatbot import TestGeneratorChatbot
-
 
 def main():
     """Run the chatbot"""
     try:
+        # Imported here so startup errors (missing API key) are reported below
+        from scout.chatbot import TestGeneratorChatbot
+
         chatbot = TestGeneratorChatbot()
         chatbot.chat()
     except KeyboardInterrupt:
@@ -14,251 +14,234 @@ Usage:
     uv run python scout/agents/playwright_test_generator.py
 """
 
+import asyncio
 import json
-from typing import TypedDict, Annotated
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
+import sys
+from typing import TypedDict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAPI_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAPI_KEY not found in .env")
+# Make the scout package importable when this file is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scout.config import MODEL, TESTS_DIR
+from scout.llm import get_llm, stream_reply
+from scout.prompts import CODE_BLOCK_RE, SYSTEM_PROMPT, prompt_cache_key
+
+SEP = "=" * 70
+
+BANNER = "\n".join([
+    "",
+    SEP,
+    "🎭 Playwright Test Generator Agent",
+    SEP,
+    "Generate automated Playwright tests for:",
+    "https://www.enbw.com/strom/privatkunden/produkte",
+    "",
+    "Type 'quit' or 'exit' to stop.",
+    SEP,
+    "",
+    "",
+])
+
+# Fixed parts of format_output, around the user request and the code
+OUTPUT_HEADER = "\n".join(["", SEP, "✨ PLAYWRIGHT TEST GENERATED", SEP, "", "📋 User Request:", ""])
+OUTPUT_CODE_HEADER = "\n".join(["", "", SEP, "🔧 Generated Test Code:", SEP, "", ""])
+OUTPUT_FOOTER = "\n".join([
+    "",
+    "",
+    SEP,
+    "✅ Ready to use! Save this code to a .py file and run with:",
+    "   uv run pytest <filename> -n auto",
+    SEP,
+    "",
+])
 
 
 # Define the agent state
 class AgentState(TypedDict):
     """State structure for the test generator agent"""
-    messages: Annotated[list[BaseMessage], add_messages]
+    # Only the current instruction is used; there is no conversation history,
+    # so no add_messages reducer cost on every node return
+    user_instruction: str
     generated_test: str
     test_description: str
 
 
+class LLMCallLimit(BaseCallbackHandler):
+    """
+    Callback that counts chat model calls in one run and aborts the run
+    before the call that would exceed max_calls is sent.
+    
+    Passed as a run callback, it reaches every nested runnable, including
+    models wrapped with bind(), with_config() or with_structured_output().
+    """
+    
+    raise_error = True  # Let the exception abort the run
+    run_inline = True  # Count in order, before the request is sent
+    
+    def __init__(self, max_calls: int):
+        self.max_calls = max_calls
+        self.calls = 0
+    
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+        if self.calls > self.max_calls:
+            raise RuntimeError(
+                f"chat() tried to make LLM call {self.calls}, expected at most {self.max_calls}"
+            )
+
+
 class PlaywrightTestGenerator:
     """
     LangGraph agent that generates Playwright tests based on user instructions.
+    
+    Each chat() turn makes a single LLM call: the model output is already in
+    the requested format and only needs the cheap regex extraction. Don't add
+    nodes that pass the output through the LLM again (e.g. to reformat or
+    lint it); if one is really needed, raise max_llm_calls explicitly.
     """
     
-    def __init__(self):
+    def __init__(self, session_id: str | None = None, max_llm_calls: int = 1):
         """Initialize the agent with OpenAI LLM"""
-        self.llm = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model="gpt-4",
-            temperature=0.2,  # Low temperature for consistent code generation
-        )
+        # Routes this session's requests to the same OpenAI prompt cache
+        self._cache_key = prompt_cache_key(session_id)
         
-        # System prompt for test generation
-        self.system_prompt = """You are an expert Playwright test generator for the EnBW website.
-
-Your task is to generate high-quality, executable Playwright test code based on user instructions.
-
-Target Website: https://www.enbw.com/strom/privatkunden/produkte
-
-Requirements:
-1. Generate complete, runnable Python code using Playwright async API
-2. Use descriptive variable names and comments
-3. Include proper error handling and waits
-4. Add assertions to verify expected behavior
-5. Generate tests that can run with: uv run pytest <test_file>
-
-Output Format:
-- Wrap the complete test code in triple backticks with ```python language tag
-- Include proper imports (asyncio, pytest, playwright)
-- Use async/await pattern
-- Make tests independent and reusable
-
-Example structure:
-```python
-import asyncio
-import pytest
-from playwright.async_api import async_playwright
-
-
-@pytest.mark.asyncio
-async def test_your_feature():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
+        # Low temperature for consistent code generation
+        self.llm = get_llm(model=MODEL, temperature=0.2)
         
-        # Your test steps here
+        # LLM calls allowed per chat() turn, enforced by LLMCallLimit
+        self.max_llm_calls = max_llm_calls
         
-        await browser.close()
-```
-
-Always:
-- Use explicit waits (wait_for_timeout, wait_for_selector)
-- Add clear print statements for debugging
-- Handle exceptions gracefully
-- Make tests maintainable and easy to modify"""
+        # System prompt for test generation, shared with the chatbot. Built
+        # once so every request starts with the same message object.
+        self._system_msg = SystemMessage(content=SYSTEM_PROMPT)
+        
+        # Compile the workflow once and reuse it for every chat turn
+        self.app = self.build_workflow()
     
-    def process_user_instruction(self, state: AgentState) -> AgentState:
+    async def process_user_instruction(self, state: AgentState) -> AgentState:
         """
         Process user instruction and generate Playwright test code.
         """
-        # Get the latest user message
-        messages = state["messages"]
-        
-        # Build messages for the LLM
-        system_msg = self.system_prompt
-        user_instruction = messages[-1].content if messages else ""
+        user_instruction = state["user_instruction"]
         
         print(f"\n📝 User Instruction: {user_instruction}")
         print("🤖 Generating Playwright test code...\n")
         
-        # Call the LLM to generate test code
-        response = self.llm.invoke([
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_instruction},
-        ])
+        # Stream the generated test code from the LLM. The system prompt is
+        # static and comes first so OpenAI can reuse the cached prefix. Not
+        # echoed: format_output shows the extracted code once the node is done.
+        generated_code = await stream_reply(self.llm, [
+            self._system_msg,
+            HumanMessage(content=user_instruction),
+        ], echo=False, extra_body={"prompt_cache_key": self._cache_key})
         
-        generated_code = response.content
+        # Extract Python code from the markdown code block if needed
+        match = CODE_BLOCK_RE.search(generated_code)
+        if match:
+            generated_code = match.group(1).strip()
         
         # Update state
-        state["messages"].append(AIMessage(content=generated_code))
         state["generated_test"] = generated_code
         state["test_description"] = user_instruction
         
         return state
     
-    def extract_test_code(self, state: AgentState) -> AgentState:
-        """Extract Python code from markdown code blocks if needed"""
-        code = state["generated_test"]
-        
-        # Check if code is wrapped in markdown backticks
-        if "```python" in code:
-            # Extract code from backticks
-            start = code.find("```python") + len("```python")
-            end = code.find("```", start)
-            if end > start:
-                code = code[start:end].strip()
-                state["generated_test"] = code
-        elif "```" in code:
-            # Generic markdown code block
-            start = code.find("```") + 3
-            end = code.find("```", start)
-            if end > start:
-                code = code[start:end].strip()
-                state["generated_test"] = code
-        
-        return state
-    
     def format_output(self, state: AgentState) -> str:
         """Format the final output for display"""
-        description = state["test_description"]
-        code = state["generated_test"]
-        
-        output = f"""
-{'='*70}
-✨ PLAYWRIGHT TEST GENERATED
-{'='*70}
-
-📋 User Request:
-{description}
-
-{'='*70}
-🔧 Generated Test Code:
-{'='*70}
-
-{code}
-
-{'='*70}
-✅ Ready to use! Save this code to a .py file and run with:
-   uv run pytest <filename> -v
-   or
-   uv run python <filename>
-{'='*70}
-"""
-        return output
+        return "".join([
+            OUTPUT_HEADER,
+            state["test_description"],
+            OUTPUT_CODE_HEADER,
+            state["generated_test"],
+            OUTPUT_FOOTER,
+        ])
     
     def build_workflow(self):
         """Build the LangGraph workflow"""
+        # Imported here: langgraph is slow to import and only needed to compile
+        from langgraph.graph import StateGraph, START, END
+        
         workflow = StateGraph(AgentState)
         
-        # Add nodes
+        # Single node: code extraction is cheap and runs at the end of it,
+        # which saves a state hand-off between nodes on every turn
         workflow.add_node("process_instruction", self.process_user_instruction)
-        workflow.add_node("extract_code", self.extract_test_code)
         
         # Add edges
         workflow.add_edge(START, "process_instruction")
-        workflow.add_edge("process_instruction", "extract_code")
-        workflow.add_edge("extract_code", END)
+        workflow.add_edge("process_instruction", END)
         
         return workflow.compile()
     
-    def chat(self, user_message: str) -> str:
+    async def chat(self, user_message: str) -> tuple[str, str]:
         """
         Interactive chat interface for the agent.
-        Accept user instructions and return generated test code.
+        Accept user instructions and return the formatted output for display
+        together with the raw generated test code.
         """
-        # Build the workflow
-        app = self.build_workflow()
-        
         # Initialize state
         initial_state: AgentState = {
-            "messages": [HumanMessage(content=user_message)],
+            "user_instruction": user_message,
             "generated_test": "",
             "test_description": "",
         }
         
-        # Run the workflow
-        final_state = app.invoke(initial_state)
+        # Run the workflow; the limit aborts the turn before an extra LLM call
+        final_state = await self.app.ainvoke(
+            initial_state,
+            config={"callbacks": [LLMCallLimit(self.max_llm_calls)]},
+        )
         
-        # Format and return output
-        return self.format_output(final_state)
+        # Format output; also return the code so callers don't re-parse it
+        return self.format_output(final_state), final_state["generated_test"]
 
 
 def main():
     """Main interactive loop for chatting with the agent"""
     
-    print("\n" + "="*70)
-    print("🎭 Playwright Test Generator Agent")
-    print("="*70)
-    print("Generate automated Playwright tests for:")
-    print("https://www.enbw.com/strom/privatkunden/produkte")
-    print("\nType 'quit' or 'exit' to stop.")
-    print("="*70 + "\n")
+    sys.stdout.write(BANNER)
+    sys.stdout.flush()
     
     generator = PlaywrightTestGenerator()
     
-    while True:
-        try:
-            # Get user input
-            user_input = input("\n💬 Your instruction (describe what to test): ").strip()
+    # One event loop for the whole session: the async OpenAI client is
+    # bound to the loop it first ran on, so it can't change between turns
+    with asyncio.Runner() as runner:
+        while True:
+            try:
+                # Get user input
+                user_input = input("\n💬 Your instruction (describe what to test): ").strip()
+                
+                if user_input.lower() in ['quit', 'exit']:
+                    print("\n👋 Goodbye!")
+                    break
+                
+                if not user_input:
+                    print("⚠️ Please provide an instruction.")
+                    continue
+                
+                # Generate test
+                output, test_code = runner.run(generator.chat(user_input))
+                print(output)
+                
+                # Option to save
+                save = input("\n💾 Save this test? (y/n): ").strip().lower()
+                if save == 'y':
+                    filename = input("   Filename (without .py): ").strip()
+                    if filename:
+                        filepath = TESTS_DIR / f"test_{filename}.py"
+                        filepath.write_text(test_code, encoding="utf-8")
+                        print(f"✅ Saved to: {filepath}")
             
-            if user_input.lower() in ['quit', 'exit']:
-                print("\n👋 Goodbye!")
+            except KeyboardInterrupt:
+                print("\n\n👋 Interrupted. Goodbye!")
                 break
-            
-            if not user_input:
-                print("⚠️ Please provide an instruction.")
-                continue
-            
-            # Generate test
-            output = generator.chat(user_input)
-            print(output)
-            
-            # Option to save
-            save = input("\n💾 Save this test? (y/n): ").strip().lower()
-            if save == 'y':
-                filename = input("   Filename (without .py): ").strip()
-                if filename:
-                    filepath = f"scout/tests/test_{filename}.py"
-                    with open(filepath, 'w') as f:
-                        # Extract just the code part
-                        code = output.split("Generated Test Code:")[1].split("Ready to use!")[0].strip()
-                        f.write(code)
-                    print(f"✅ Saved to: {filepath}")
-        
-        except KeyboardInterrupt:
-            print("\n\n👋 Interrupted. Goodbye!")
-            break
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-            print("Please try again.")
+            except Exception as e:
+                print(f"\n❌ Error: {e}")
+                print("Please try again.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""
+Local response cache
+
+Identical requests (same model, temperature and messages) are answered from
+a SQLite file instead of calling the API again. This is independent of
+OpenAI's server-side prompt caching, which still charges for every call.
+
+Meant for development and demos: it is only enabled when LLM_CACHE_PATH is
+set, since users normally re-submit a description to get a different result.
+"""
+
+import hashlib
+import json
+import sqlite3
+
+from scout.config import LLM_CACHE_PATH
+
+
+class ResponseCache:
+    """SQLite-backed map of request -> response text, kept across runs"""
+
+    def __init__(self, path: str | None):
+        # No path disables the cache; the database is opened on first use
+        self._path = path
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+            )
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: list[dict]) -> str:
+        """Hash everything that determines the response"""
+        payload = json.dumps([model, temperature, messages], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        row = self._connect().execute(
+            "SELECT response FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str) -> None:
+        if not self.enabled:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)",
+                (key, response),
+            )
+
+
+response_cache = ResponseCache(LLM_CACHE_PATH)
@@ -3,86 +3,160 @@
 Playwright Test Generator Chatbot
 """
 
-import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+import asyncio
+import sys
+from functools import cached_property
+from scout.config import MODEL, TESTS_DIR
+from scout.cache import response_cache
+from scout.prompts import CODE_BLOCK_RE, SYSTEM_PROMPT, prompt_cache_key
 
-load_dotenv()
+# LangChain modules are imported on first use below: they take hundreds of
+# milliseconds to import and aren't needed to start the chat loop
 
-OPENAI_API_KEY = os.getenv("OPENAPI_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAPI_KEY not found")
+SEP = "=" * 70
+
+BANNER = "\n".join([
+    "",
+    SEP,
+    "🎭 PLAYWRIGHT TEST GENERATOR",
+    SEP,
+    "",
+    "Website: https://www.enbw.com/strom/privatkunden/produkte",
+    "",
+    "Describe what to test → generates Playwright code",
+    "Type 'save' to save, 'quit' to exit",
+    "",
+    SEP,
+    "",
+    "",
+])
+
+CODE_HEADER = "\n".join(["", "🤖 Generating...", "", SEP, "📋 Generated Code:", SEP, ""])
+CODE_FOOTER = SEP + "\n\n"
 
 
 class TestGeneratorChatbot:
     """AI chatbot that generates Playwright tests"""
     
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model="gpt-4",
-            temperature=0.2,
-        )
+    def __init__(self, session_id: str | None = None):
+        self._cache_key = prompt_cache_key(session_id)
+    
+    @cached_property
+    def llm(self):
+        from scout.llm import get_llm
+        return get_llm(model=MODEL, temperature=0.2)
+    
+    @cached_property
+    def _system_msg(self):
+        # Shared with the agent and built once, so every request starts with the
+        # same message object; the user description only goes in the user turn
+        from langchain_core.messages import SystemMessage
+        return SystemMessage(content=SYSTEM_PROMPT)
+    
+    async def generate(self, description):
+        """Stream the generated code to stdout and return it"""
+        from langchain_core.messages import HumanMessage
+        from scout.llm import stream_reply
         
-        self.system_prompt = """You are a Playwright test code generator.
-Generate complete, executable Python test code based on user descriptions.
-Target: https://www.enbw.com/strom/privatkunden/produkte
-Output: Only the Python code, ready to use."""
+        return await stream_reply(self.llm, [
+            self._system_msg,
+            HumanMessage(content=description),
+        ], extra_body={"prompt_cache_key": self._cache_key})
+    
+    @staticmethod
+    def extract_code(reply: str) -> str:
+        """Return the code from the reply's markdown block (or the reply as is)"""
+        match = CODE_BLOCK_RE.search(reply)
+        return match.group(1).strip() if match else reply
     
-    def generate(self, description):
-        response = self.llm.invoke([
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": description},
-        ])
-        return response.content
+    async def generate_many(self, descriptions: list[str]) -> list[str]:
+        """
+        Generate code for several descriptions with concurrent requests.
+        
+        Returns the extracted test code for each description, in order, ready
+        to be written to a file.
+        """
+        from langchain_core.messages import HumanMessage
+        from scout.llm import cache_key, report_usage, with_batch_retry
+        
+        # Identical descriptions are generated once
+        unique = list(dict.fromkeys(descriptions))
+        prompts = [
+            [self._system_msg, HumanMessage(content=description)]
+            for description in unique
+        ]
+        keys = [cache_key(self.llm, prompt) for prompt in prompts]
+        replies = [response_cache.get(key) for key in keys]
+        
+        # Only send the prompts that aren't in the local cache
+        missing = [i for i, reply in enumerate(replies) if reply is None]
+        if missing:
+            responses = await with_batch_retry(self.llm).abatch(
+                [prompts[i] for i in missing],
+                config={"max_concurrency": 8},
+                return_exceptions=True,
+                extra_body={"prompt_cache_key": self._cache_key},
+            )
+            # Keep (and cache) every reply that succeeded before reporting
+            # the first failure
+            errors = []
+            for i, response in zip(missing, responses):
+                if isinstance(response, Exception):
+                    errors.append(response)
+                    continue
+                report_usage(response.usage_metadata)
+                replies[i] = response.content
+                if response.response_metadata.get("finish_reason") == "stop":
+                    response_cache.put(keys[i], response.content)
+            if errors:
+                raise errors[0]
+        
+        code_by_description = {
+            description: self.extract_code(reply)
+            for description, reply in zip(unique, replies)
+        }
+        return [code_by_description[description] for description in descriptions]
     
     def chat(self):
-        print("\n" + "="*70)
-        print("🎭 PLAYWRIGHT TEST GENERATOR")
-        print("="*70)
-        print("\nWebsite: https://www.enbw.com/strom/privatkunden/produkte")
-        print("\nDescribe what to test → generates Playwright code")
-        print("Type 'save' to save, 'quit' to exit\n")
-        print("="*70 + "\n")
+        sys.stdout.write(BANNER)
+        sys.stdout.flush()
         
         last_code = None
         
-        while True:
-            try:
-                user_input = input("💬 You: ").strip()
-                
-                if not user_input:
-                    continue
-                
-                if user_input.lower() in ['quit', 'exit']:
-                    print("\n👋 Goodbye!")
-                    break
-                
-                if user_input.lower() == 'save':
-                    if not last_code:
-                        print("⚠️  No code yet\n")
+        # One event loop for the whole session: the async OpenAI client is
+        # bound to the loop it first ran on, so it can't change between turns
+        with asyncio.Runner() as runner:
+            while True:
+                try:
+                    user_input = input("💬 You: ").strip()
+                    
+                    if not user_input:
                         continue
-                    filename = input("Filename (no .py): ").strip()
-                    if filename:
-                        os.makedirs("scout/tests", exist_ok=True)
-                        path = f"scout/tests/test_{filename}.py"
-                        with open(path, 'w') as f:
-                            f.write(last_code)
-                        print(f"✅ Saved: {path}\n")
-                    continue
-                
-                print("\n🤖 Generating...\n")
-                code = self.generate(user_input)
-                last_code = code
-                
-                print("="*70)
-                print("📋 Generated Code:")
-                print("="*70)
-                print(code)
-                print("="*70 + "\n")
-                
-            except KeyboardInterrupt:
-                print("\n\n👋 Interrupted!")
-                break
-            except Exception as e:
-                print(f"\n❌ Error: {e}\n")
+                    
+                    if user_input.lower() in ['quit', 'exit']:
+                        print("\n👋 Goodbye!")
+                        break
+                    
+                    if user_input.lower() == 'save':
+                        if not last_code:
+                            print("⚠️  No code yet\n")
+                            continue
+                        filename = input("Filename (no .py): ").strip()
+                        if filename:
+                            path = TESTS_DIR / f"test_{filename}.py"
+                            path.write_text(last_code, encoding="utf-8")
+                            print(f"✅ Saved: {path}\n")
+                        continue
+                    
+                    sys.stdout.write(CODE_HEADER)
+                    sys.stdout.flush()
+                    code = runner.run(self.generate(user_input))
+                    # Save only the code, without the markdown fence
+                    last_code = self.extract_code(code)
+                    sys.stdout.write(CODE_FOOTER)
+                    
+                except KeyboardInterrupt:
+                    print("\n\n👋 Interrupted!")
+                    break
+                except Exception as e:
+                    print(f"\n❌ Error: {e}\n")
@@ -0,0 +1,37 @@
+"""
+Configuration read from the environment and .env
+
+Loaded once per process, no matter how many entry points import it.
+"""
+
+import os
+from functools import cache
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+@cache
+def load_config() -> tuple[str, str, str | None]:
+    """Load .env once and return (api_key, model, llm_cache_path)"""
+    load_dotenv()
+
+    # OPENAPI_KEY is the old (misspelled) name, still accepted for existing .env files
+    api_key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAPI_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in .env")
+
+    # Chat model for all requests; OpenAI prompt caching needs gpt-4o or newer
+    model = os.getenv("MODEL", "gpt-4o-mini")
+
+    # Local response cache (dev/demo aid): off unless a database path is set
+    llm_cache_path = os.getenv("LLM_CACHE_PATH") or None
+
+    return api_key, model, llm_cache_path
+
+
+OPENAI_API_KEY, MODEL, LLM_CACHE_PATH = load_config()
+
+# Where saved tests go; created here once instead of on every save
+TESTS_DIR = Path("scout/tests")
+TESTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,113 @@
+"""
+Shared OpenAI chat model
+
+The chatbot and the agent use the same ChatOpenAI instance (and with it the
+same underlying OpenAI client and connection pool) for a given configuration.
+"""
+
+from functools import lru_cache
+
+import httpx
+from langchain_core.messages import BaseMessage
+from langchain_openai import ChatOpenAI
+
+from scout.cache import response_cache
+from scout.config import OPENAI_API_KEY
+
+
+# Kept-alive connections are reused across turns, so only the first request
+# pays for the TLS handshake; 8 matches the concurrency of generate_many
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=8)
+HTTP_TIMEOUT = 60
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str, temperature: float) -> ChatOpenAI:
+    """Return the process-wide ChatOpenAI instance for (model, temperature)"""
+    return ChatOpenAI(
+        api_key=OPENAI_API_KEY,
+        model=model,
+        temperature=temperature,
+        streaming=True,
+        stream_usage=True,  # Token usage (incl. cached tokens) on the last chunk
+        max_retries=0,  # Interactive use: surface errors instead of waiting on retries
+        timeout=HTTP_TIMEOUT,
+        http_client=httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+        http_async_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+    )
+
+
+def with_batch_retry(llm: ChatOpenAI):
+    """
+    Wrap llm with retries on transient API errors for batch use.
+    
+    The shared client has retries off for interactive turns; in a batch one
+    rate limit or server error would otherwise fail every request in it.
+    """
+    import openai
+    
+    return llm.with_retry(
+        retry_if_exception_type=(
+            openai.RateLimitError,
+            openai.APIConnectionError,  # Includes timeouts
+            openai.InternalServerError,
+        ),
+        stop_after_attempt=3,
+        wait_exponential_jitter=True,
+    )
+
+
+def report_usage(usage: dict | None) -> None:
+    """Print prompt/cached/completion token counts of a response"""
+    if not usage:
+        return
+    cached = usage.get("input_token_details", {}).get("cache_read", 0)
+    print(f"📊 Tokens: {usage['input_tokens']} prompt ({cached} cached), "
+          f"{usage['output_tokens']} completion")
+
+
+def cache_key(llm: ChatOpenAI, messages: list[BaseMessage]) -> str:
+    """Local response cache key for sending messages to llm"""
+    return response_cache.make_key(
+        llm.model_name,
+        llm.temperature,
+        [{"role": message.type, "content": message.content} for message in messages],
+    )
+
+
+async def stream_reply(
+    llm: ChatOpenAI, messages: list[BaseMessage], echo: bool = True, **kwargs
+) -> str:
+    """
+    Stream the model reply and return the full text.
+    
+    With echo, the reply is printed to stdout as it arrives; callers that
+    display the result themselves pass echo=False.
+    """
+    key = cache_key(llm, messages)
+    cached = response_cache.get(key)
+    if cached is not None:
+        if echo:
+            print(cached)
+        print("📦 Cached response (no API call)")
+        return cached
+    
+    parts = []
+    usage = None
+    finish_reason = None
+    async for chunk in llm.astream(messages, **kwargs):
+        if echo:
+            print(chunk.content, end="", flush=True)
+        parts.append(chunk.content)
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+        finish_reason = chunk.response_metadata.get("finish_reason") or finish_reason
+    if echo:
+        print()
+    report_usage(usage)
+    
+    reply = "".join(parts)
+    # Don't keep truncated or filtered replies
+    if finish_reason == "stop":
+        response_cache.put(key, reply)
+    return reply